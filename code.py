@@ -1,86 +1,94 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from engine import FEEDBACK_TABLE, static_outcome
 
 # --- CONFIGURATION & GAME CONSTANTS ---
 MAX_PERIODS = 8  # 8 Quarters (2 Years)
 STARTING_CASH = 500  # in Crores
 STARTING_SHARE = 59.0  # Percentage
 BIRLA_SHARE = 5.0     # Percentage
-DEMAND_BASE = 1000    # Base units
+DEFAULT_SEED = 12345  # Scenario sequence seed
 
 # --- INITIALIZATION ---
-def init_game():
+def init_game(seed=DEFAULT_SEED):
     if 'period' not in st.session_state:
         st.session_state['period'] = 1
+        # Draw every quarter's scenario up front from a per-game generator
+        st.session_state['seed'] = seed
+        rng = np.random.default_rng(seed)
+        scenario_rolls = rng.random(MAX_PERIODS)
+        st.session_state['scenario_idx_seq'] = np.searchsorted(SCENARIO_THRESHOLDS, scenario_rolls, side='right').astype(np.int8)
         st.session_state['cash'] = STARTING_CASH
         st.session_state['market_share'] = STARTING_SHARE
         st.session_state['birla_share'] = BIRLA_SHARE
-        st.session_state['history'] = []
+        init_history()
         st.session_state['game_over'] = False
         st.session_state['last_feedback'] = "Welcome, Vikram. Birla Opus has just launched. Your dealers are anxious. Make your Q1 decisions."
 
-def reset_game():
+def init_history():
+    # Columnar history: one preallocated array per field plus a fill cursor
+    st.session_state['history'] = {
+        'quarter': np.empty(MAX_PERIODS, dtype=np.int8),
+        'scenario_idx': np.empty(MAX_PERIODS, dtype=np.int8),
+        'strategy_idx': np.empty(MAX_PERIODS, dtype=np.int8),
+        'profit': np.empty(MAX_PERIODS, dtype=np.float32),
+        'share': np.empty(MAX_PERIODS, dtype=np.float32),
+    }
+    st.session_state['hist_len'] = 0
+
+def history_frame():
+    h = st.session_state['history']
+    n = st.session_state['hist_len']
+    return pd.DataFrame({
+        "Quarter": h['quarter'][:n],
+        "Scenario": pd.Categorical.from_codes(h['scenario_idx'][:n], [name for name, _ in SCENARIO_CTX]),
+        "Strategy": pd.Categorical.from_codes(h['strategy_idx'][:n], STRATEGY_NAMES),
+        "Profit": h['profit'][:n],
+        "Market_Share_End": h['share'][:n],
+    }, copy=False)
+
+@st.cache_data
+def _build_charts(profit_bytes, share_bytes):
+    # Takes raw buffer bytes because ndarrays aren't hashable as cache keys
+    profit = np.frombuffer(profit_bytes, dtype=np.float32)
+    share = np.frombuffer(share_bytes, dtype=np.float32)
+    return pd.DataFrame(
+        {"Profit": profit, "Market_Share_End": share},
+        index=pd.Index(np.arange(1, len(profit) + 1), name="Quarter"),
+    )
+
+def reset_game(seed=DEFAULT_SEED):
     st.session_state.clear()
-    init_game()
+    init_game(seed)
+    st.session_state['_metrics_dirty'] = True
 
 # --- THE SIMULATION ENGINE ---
-def calculate_results(delivery_freq, inventory_policy, dealer_incentive, demand_type):
-    
-    # 1. Base Costs (Efficiency Levers)
-    logistics_cost = 80 if delivery_freq == "4x Daily (Responsive)" else 30
-    inventory_cost = 50 if inventory_policy == "High Buffer (Responsive)" else 20
-    incentive_cost = 60 if dealer_incentive == "Match Birla (High)" else 20
-    
-    total_opex = logistics_cost + inventory_cost + incentive_cost
-
-    # 2. Service Level Calculation
-    service_score = 0
-    
-    if delivery_freq == "4x Daily (Responsive)":
-        service_score += 40
-    else:
-        service_score += 10 
-        
-    if inventory_policy == "High Buffer (Responsive)":
-        service_score += 40
-    else:
-        service_score += 10 
-        
-    if dealer_incentive == "Match Birla (High)":
-        service_score += 20
-    else:
-        service_score += 5 
-
-    # 3. Apply Volatility (Difficulty Multiplier)
-    if demand_type != "Stable":
-        if inventory_policy == "Lean (Efficient)":
-            service_score -= 30 
-        if delivery_freq == "1x Daily (Efficient)":
-            service_score -= 20 
-
-    service_score = max(0, min(100, service_score))
-
-    # 4. Market Share Impact
-    share_change = 0
-    if service_score >= 85:
-        share_change = 0.5 
-        feedback = "Dealers are happy. Availability is high."
-    elif service_score >= 60:
-        share_change = -1.5 
-        feedback = "Dealers are grumbling. Some are stocking Birla Opus alongside yours."
-    else:
-        share_change = -5.0 
-        feedback = "DISASTER! Stockouts during peak demand. Dealers are furious and aggressively pushing Birla Opus."
-
-    # 5. Financials
-    demand_multiplier = 1.5 if demand_type == "Festival Season" else 1.0
-    actual_revenue = (DEMAND_BASE * demand_multiplier) * (st.session_state['market_share'] / 100) * (service_score / 100) * 0.5
-    
+# Decisions are encoded as 0 = Responsive option, 1 = Efficient option.
+STRATEGY_NAMES = ("Responsive", "Efficient")
+DELIVERY_OPTIONS = ("4x Daily (Responsive)", "1x Daily (Efficient)")
+INVENTORY_OPTIONS = ("High Buffer (Responsive)", "Lean (Efficient)")
+INCENTIVE_OPTIONS = ("Match Birla (High)", "Standard (Low)")
+
+# Scenario picked by which band the quarter's roll lands in: < 0.3, 0.3-0.7, >= 0.7
+SCENARIO_THRESHOLDS = np.array([0.3, 0.7])
+SCENARIO_CTX = (
+    ("Stable", "Demand is flat. A quiet quarter."),
+    ("Volatile", "Competitor Price War! Birla is undercutting prices aggressively."),
+    ("Festival Season", "Diwali Peak! Demand is skyrocketing and highly unpredictable."),
+)
+
+def calculate_results(d, i, c, demand_idx):
+    # Resubmitting the same decisions for the same scenario reuses the last outcome as-is
+    decisions = (d, i, c, demand_idx)
+    if st.session_state.get('_last_decisions') != decisions:
+        st.session_state['_last_outcome'] = static_outcome(*decisions)
+        st.session_state['_last_decisions'] = decisions
+    total_opex, base_revenue, share_change, band = st.session_state['_last_outcome']
+    actual_revenue = base_revenue * (st.session_state['market_share'] / 100)
     net_profit = actual_revenue - total_opex
-
-    return net_profit, share_change, feedback, total_opex, actual_revenue
+    return net_profit, share_change, FEEDBACK_TABLE[band], total_opex, actual_revenue
 
 # --- MAIN APP UI ---
 st.set_page_config(page_title="Asian Paints Strategy Sim", layout="wide")
@@ -98,18 +106,28 @@ st.markdown("""
 with st.sidebar:
     st.header(f"Quarter: {st.session_state['period']} / {MAX_PERIODS}")
     
-    share_delta = 0
-    # FIX: Ensure key access matches the save key (Market_Share_End)
-    if len(st.session_state['history']) > 0:
-        share_delta = st.session_state['market_share'] - st.session_state['history'][-1]['Market_Share_End']
+    # Metric text only changes on submit/reset; other reruns reuse the formatted labels
+    if st.session_state.get('_metrics_dirty', True):
+        share_delta = 0
+        if st.session_state['hist_len'] > 0:
+            share_delta = st.session_state['market_share'] - st.session_state['history']['share'][st.session_state['hist_len'] - 1]
+        st.session_state['_metric_labels'] = (
+            "₹" + str(st.session_state['cash']) + " Cr",
+            f"{st.session_state['market_share']:.1f}%",
+            f"{share_delta:.1f}%",
+            f"{st.session_state['birla_share']:.1f}%",
+        )
+        st.session_state['_metrics_dirty'] = False
+    cash_label, share_label, share_delta_label, birla_label = st.session_state['_metric_labels']
         
-    st.metric("💰 Cash Reserve", f"₹{st.session_state['cash']:.0f} Cr")
-    st.metric("📈 Market Share", f"{st.session_state['market_share']:.1f}%", delta=f"{share_delta:.1f}%")
-    st.metric("😈 Birla Opus Share", f"{st.session_state['birla_share']:.1f}%")
+    st.metric("💰 Cash Reserve", cash_label)
+    st.metric("📈 Market Share", share_label, delta=share_delta_label)
+    st.metric("😈 Birla Opus Share", birla_label)
     
     st.divider()
+    seed = st.number_input("Seed", min_value=0, value=st.session_state['seed'], step=1, help="Same seed, same sequence of market conditions. Applied on restart.")
     if st.button("Restart Simulation"):
-        reset_game()
+        reset_game(int(seed))
         st.rerun()
 
 # --- GAME OVER SCREEN ---
@@ -120,25 +138,16 @@ if st.session_state['game_over']:
     elif st.session_state['cash'] < 0:
         st.write("❌ You went bankrupt trying to fight a price war.")
     else:
-        st.success(f"✅ Simulation Complete! Final Cash: ₹{st.session_state['cash']:.0f} Cr. Final Share: {st.session_state['market_share']:.1f}%")
+        st.success(f"✅ Simulation Complete! Final Cash: ₹{st.session_state['cash']} Cr. Final Share: {st.session_state['market_share']:.1f}%")
     
     # Show History Data
-    df = pd.DataFrame(st.session_state['history'])
+    df = history_frame()
     st.dataframe(df)
     st.stop()
 
 # --- SCENARIO GENERATOR ---
-np.random.seed(st.session_state['period'] * 99)
-scenario_roll = np.random.random()
-if scenario_roll < 0.3:
-    scenario = "Stable"
-    context = "Demand is flat. A quiet quarter."
-elif scenario_roll < 0.7:
-    scenario = "Volatile"
-    context = "Competitor Price War! Birla is undercutting prices aggressively."
-else:
-    scenario = "Festival Season"
-    context = "Diwali Peak! Demand is skyrocketing and highly unpredictable."
+scenario_idx = int(st.session_state['scenario_idx_seq'][st.session_state['period'] - 1])
+scenario, context = SCENARIO_CTX[scenario_idx]
 
 st.info(f"**Market Conditions for Q{st.session_state['period']}: {scenario}** - {context}")
 
@@ -148,43 +157,45 @@ with st.form("decision_form"):
     
     with c1:
         st.subheader("1. Logistics")
-        delivery = st.radio("Delivery Frequency", ["4x Daily (Responsive)", "1x Daily (Efficient)"], help="4x costs more but guarantees availability.")
+        d = st.radio("Delivery Frequency", (0, 1), format_func=DELIVERY_OPTIONS.__getitem__, help="4x costs more but guarantees availability.")
         
     with c2:
         st.subheader("2. Inventory")
-        inventory = st.radio("Stocking Policy", ["High Buffer (Responsive)", "Lean (Efficient)"], help="High Buffer prevents stockouts during spikes.")
+        i = st.radio("Stocking Policy", (0, 1), format_func=INVENTORY_OPTIONS.__getitem__, help="High Buffer prevents stockouts during spikes.")
         
     with c3:
         st.subheader("3. Dealer Relations")
-        incentive = st.radio("Commissions", ["Match Birla (High)", "Standard (Low)"], help="Paying dealers more reduces profit but keeps loyalty.")
+        c = st.radio("Commissions", (0, 1), format_func=INCENTIVE_OPTIONS.__getitem__, help="Paying dealers more reduces profit but keeps loyalty.")
         
     submitted = st.form_submit_button("Run Quarter")
 
 if submitted:
     # Run Calculation
-    profit, share_change, feedback, opex, rev = calculate_results(delivery, inventory, incentive, scenario)
+    profit, share_change, feedback, opex, rev = calculate_results(d, i, c, scenario_idx)
     
     # Update State
-    st.session_state['cash'] += profit
+    st.session_state['cash'] += round(profit)  # whole crores, so cash stays an int
     prev_share = st.session_state['market_share']
     st.session_state['market_share'] += share_change
     st.session_state['birla_share'] -= share_change 
     st.session_state['last_feedback'] = feedback
     
     # Record History
-    st.session_state['history'].append({
-        "Quarter": st.session_state['period'],
-        "Scenario": scenario,
-        "Strategy": "Responsive" if delivery.startswith("4x") else "Efficient",
-        "Profit": round(profit, 2),
-        "Market_Share_End": round(st.session_state['market_share'], 2)
-    })
+    h = st.session_state['history']
+    n = st.session_state['hist_len']
+    h['quarter'][n] = st.session_state['period']
+    h['scenario_idx'][n] = scenario_idx
+    h['strategy_idx'][n] = d
+    h['profit'][n] = round(profit, 2)
+    h['share'][n] = round(st.session_state['market_share'], 2)
+    st.session_state['hist_len'] = n + 1
     
     # Check Game Over
     st.session_state['period'] += 1
     if st.session_state['period'] > MAX_PERIODS or st.session_state['cash'] < 0 or st.session_state['market_share'] < 40:
         st.session_state['game_over'] = True
         
+    st.session_state['_metrics_dirty'] = True
     st.rerun()
 
 # --- DASHBOARD & GRAPHS ---
@@ -192,21 +203,23 @@ st.divider()
 st.subheader("Analyst Report")
 
 # Feedback Box
-if st.session_state['history']:
-    last_round = st.session_state['history'][-1]
-    profit_color = "green" if last_round['Profit'] > 0 else "red"
+hist_len = st.session_state['hist_len']
+if hist_len > 0:
+    last_profit = st.session_state['history']['profit'][hist_len - 1]
+    profit_color = "green" if last_profit > 0 else "red"
     
     st.markdown(f"**Last Quarter Feedback:** {st.session_state['last_feedback']}")
-    st.markdown(f"**Net Profit:** :{profit_color}[₹{last_round['Profit']} Cr]")
+    st.markdown(f"**Net Profit:** :{profit_color}[₹{last_profit} Cr]")
 
     # Graphs
-    if len(st.session_state['history']) > 0:
-        hist_df = pd.DataFrame(st.session_state['history'])
+    if hist_len > 0:
+        h = st.session_state['history']
+        chart_df = _build_charts(h['profit'][:hist_len].tobytes(), h['share'][:hist_len].tobytes())
         
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("##### Market Share Trend")
-            st.line_chart(hist_df.set_index("Quarter")['Market_Share_End'])
+            st.line_chart(chart_df['Market_Share_End'])
         with col2:
             st.markdown("##### Profit Trend")
-            st.bar_chart(hist_df.set_index("Quarter")['Profit'])
+            st.bar_chart(chart_df['Profit'])
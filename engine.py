@@ -0,0 +1,62 @@
+# Simulation engine, kept out of code.py so Streamlit reruns don't rebuild
+# and recompile it: the module is imported (and compiled) once per process.
+import functools
+
+import numpy as np
+from numba import njit
+
+DEMAND_BASE = 1000    # Base units
+
+# Decisions are encoded as 0 = Responsive option, 1 = Efficient option.
+LOGISTICS_COST = np.array([80, 30])
+INVENTORY_COST = np.array([50, 20])
+INCENTIVE_COST = np.array([60, 20])
+
+LOGISTICS_SVC = np.array([40, 10])
+INVENTORY_SVC = np.array([40, 10])
+INCENTIVE_SVC = np.array([20, 5])
+
+# Service penalty by [scenario, inventory, delivery]; only non-stable demand hurts lean choices
+VOLATILITY_PENALTY = np.array([
+    [[0, 0], [0, 0]],
+    [[0, 20], [30, 50]],
+    [[0, 20], [30, 50]],
+], dtype=np.int8)
+
+# Service bands: < 60, 60-84, >= 85
+SERVICE_BANDS = np.array([60, 85])
+SHARE_TABLE = np.array([-5.0, -1.5, 0.5])
+FEEDBACK_TABLE = (
+    "DISASTER! Stockouts during peak demand. Dealers are furious and aggressively pushing Birla Opus.",
+    "Dealers are grumbling. Some are stocking Birla Opus alongside yours.",
+    "Dealers are happy. Availability is high.",
+)
+
+DEMAND_MULTIPLIER = np.array([1.0, 1.0, 1.5])  # Stable, Volatile, Festival Season
+
+@njit('Tuple((f8,f8,f8,i1))(i1,i1,i1,i1)', cache=True)
+def calc_core(d, i, c, demand_idx):
+    
+    # 1. Base Costs (Efficiency Levers)
+    total_opex = LOGISTICS_COST[d] + INVENTORY_COST[i] + INCENTIVE_COST[c]
+
+    # 2. Service Level Calculation
+    service_score = LOGISTICS_SVC[d] + INVENTORY_SVC[i] + INCENTIVE_SVC[c]
+
+    # 3. Apply Volatility (Difficulty Multiplier)
+    service_score -= VOLATILITY_PENALTY[demand_idx, i, d]
+    service_score = max(0, min(100, service_score))
+
+    # 4. Market Share Impact
+    band = np.searchsorted(SERVICE_BANDS, service_score, side='right')
+    share_change = SHARE_TABLE[band]
+
+    # 5. Financials (revenue at 100% share; scaled by market share in calculate_results)
+    base_revenue = (DEMAND_BASE * DEMAND_MULTIPLIER[demand_idx]) * (service_score / 100) * 0.5
+
+    return float(total_opex), base_revenue, share_change, np.int8(band)
+
+# Outcomes depend only on (d, i, c, scenario): at most 24 distinct calls
+@functools.lru_cache(maxsize=32)
+def static_outcome(d, i, c, demand_idx):
+    return calc_core(d, i, c, demand_idx)